@@ -0,0 +1,53 @@
+import os
+
+from ..metrics import search_budget_overruns
+
+# default ES-side budget for every search; "" disables the timeout
+ES_QUERY_TIMEOUT = os.getenv("ES_QUERY_TIMEOUT", "1s")
+ES_TERMINATE_AFTER = int(os.getenv("ES_TERMINATE_AFTER", "0"))
+# per-endpoint overrides: "explore=500ms:100000,suggest=200ms" (timeout[:terminate_after])
+ES_QUERY_BUDGETS = os.getenv("ES_QUERY_BUDGETS", "suggest=200ms")
+
+
+def parse_budgets(spec: str) -> dict:
+    budgets = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        source, _, values = item.partition("=")
+        timeout, _, terminate_after = values.partition(":")
+        budgets[source.strip()] = (
+            timeout.strip() or ES_QUERY_TIMEOUT,
+            int(terminate_after) if terminate_after else ES_TERMINATE_AFTER,
+        )
+    return budgets
+
+
+_budgets = parse_budgets(ES_QUERY_BUDGETS)
+
+
+def search_budget(source: str) -> dict:
+    """Keyword arguments for client.search limiting how long ES may work on a query."""
+    timeout, terminate_after = _budgets.get(source, (ES_QUERY_TIMEOUT, ES_TERMINATE_AFTER))
+    budget = {}
+    if timeout:
+        budget["timeout"] = timeout
+    if terminate_after:
+        budget["terminate_after"] = terminate_after
+    return budget
+
+
+def is_partial(response, source: str) -> bool:
+    """
+    True when ES stopped before visiting every matching document because of
+    the budget. (terminated_early is also set by index-sort early termination,
+    which is exact, so it only counts when terminate_after was requested.)
+    """
+    if response.get("timed_out"):
+        search_budget_overruns.labels(source=source, reason="timed_out").inc()
+        return True
+    if response.get("terminated_early") and "terminate_after" in search_budget(source):
+        search_budget_overruns.labels(source=source, reason="terminated_early").inc()
+        return True
+    return False
@@ -1,16 +1,46 @@
+import asyncio
+import copy
+import logging
+import os
+import sys
+
 from .client import client
 
+logger = logging.getLogger(__name__)
+
+RECIPE_INDEX = "recipes"
+
+# create new recipe indices routed by user_id so per-user queries hit a
+# single shard; every writer must then index with routing=<user_id>.
+# Queries only pass routing once the live index requires it (see routes_by_user).
+ROUTE_BY_USER = os.getenv("RECIPE_ROUTING_BY_USER", "false").lower() in ("1", "true", "yes")
+# how often a running reindex task is polled during migration
+MIGRATION_POLL_INTERVAL = float(os.getenv("MIGRATION_POLL_INTERVAL_SECONDS", "5"))
+
+# whether the index behind `recipes` requires routing, read at startup
+_live_route_by_user = False
+RECIPE_INDEX_SHARDS = os.getenv("RECIPE_INDEX_SHARDS")
+# store segments sorted by created_at desc so date-ordered queries can stop early
+SORT_BY_CREATED_AT = os.getenv("RECIPE_INDEX_SORT_BY_CREATED_AT", "false").lower() in ("1", "true", "yes")
+
 RECIPE_INDEX_SETTINGS = {
     "mappings": {
         "properties": {
-            "recipe_name": {"type": "text"},
+            "recipe_name": {
+                "type": "text",
+                "fields": {"suggest": {"type": "search_as_you_type"}}
+            },
             "recipe_id": {"type": "keyword"},
             "user_id": {"type": "keyword"},
             "description": {"type": "text"},
             "ingredients": {"type": "text"},
             "cooking_time": {"type": "text"},
             "total_time": {"type": "text"},
-            "keywords": {"type": "keyword"},
+            "total_minutes": {"type": "integer"},
+            "keywords": {
+                "type": "keyword",
+                "fields": {"suggest": {"type": "search_as_you_type"}}
+            },
             "category": {"type": "keyword"},
             "visibility": {"type": "keyword"},
             "created_at": {"type": "date"}
@@ -18,10 +48,258 @@ RECIPE_INDEX_SETTINGS = {
     }
 }
 
+# fields that can be added to an already existing index (za SUGGEST, FACETS)
+ADDED_FIELDS = {
+    name: RECIPE_INDEX_SETTINGS["mappings"]["properties"][name]
+    for name in ("recipe_name", "keywords", "total_minutes")
+}
+
+# total_time is written as "HH:MM:SS" text; this pipeline (the index's
+# default_pipeline) derives the numeric total_minutes used by max_time
+# filters and facets on every write, reindex and update_by_query
+TOTAL_MINUTES_PIPELINE = "recipes-total-minutes"
+TOTAL_MINUTES_PIPELINE_BODY = {
+    "description": "Derive total_minutes from total_time",
+    "processors": [
+        {
+            "script": {
+                "lang": "painless",
+                "source": """
+                    def v = ctx.total_time;
+                    if (v instanceof Number) {
+                        ctx.total_minutes = ((Number) v).intValue();
+                    } else if (v != null) {
+                        String[] parts = v.toString().splitOnToken(':');
+                        try {
+                            if (parts.length == 3) {
+                                ctx.total_minutes = Integer.parseInt(parts[0]) * 60 + Integer.parseInt(parts[1]);
+                            } else if (parts.length <= 2) {
+                                ctx.total_minutes = Integer.parseInt(parts[0]);
+                            }
+                        } catch (NumberFormatException e) {}
+                    }
+                """
+            }
+        }
+    ]
+}
+
+
+async def put_pipelines():
+    await client.ingest.put_pipeline(id=TOTAL_MINUTES_PIPELINE, **TOTAL_MINUTES_PIPELINE_BODY)
+
+
+def recipe_index_body() -> dict:
+    """
+    Index body for newly created recipe indices, including the optional
+    layout settings (shard count, user_id routing, index sorting) from the
+    environment.
+    """
+    body = copy.deepcopy(RECIPE_INDEX_SETTINGS)
+    index_settings = {"default_pipeline": TOTAL_MINUTES_PIPELINE}
+    body["settings"] = {"index": index_settings}
+    if RECIPE_INDEX_SHARDS:
+        body["settings"]["number_of_shards"] = int(RECIPE_INDEX_SHARDS)
+    if SORT_BY_CREATED_AT:
+        index_settings["sort.field"] = "created_at"
+        index_settings["sort.order"] = "desc"
+    if ROUTE_BY_USER:
+        body["mappings"]["_routing"] = {"required": True}
+    return body
+
+
+def routes_by_user() -> bool:
+    """True when the live `recipes` index is routed by user_id."""
+    return _live_route_by_user
+
+
+async def current_mappings() -> dict:
+    """Mappings of the index currently behind `recipes` (index or alias)."""
+    response = await client.indices.get_mapping(index=RECIPE_INDEX)
+    return next(iter(response.values()), {}).get("mappings", {})
+
+
+# recipes indexed before total_minutes (and the suggest fields) existed
+MISSING_TOTAL_MINUTES_QUERY = {
+    "bool": {
+        "filter": [{"exists": {"field": "total_time"}}],
+        "must_not": [{"exists": {"field": "total_minutes"}}],
+    }
+}
+
+
+async def backfill_recipes(query: dict | None = None):
+    """
+    Re-index recipes (all, or those matching `query`) in place so fields
+    added to the mapping later (the suggest multi-fields, total_minutes)
+    are populated for existing documents.
+    Runs as a background task in ES; returns the task id.
+    """
+    response = await client.update_by_query(
+        index=RECIPE_INDEX,
+        query=query,
+        conflicts="proceed",
+        wait_for_completion=False,
+    )
+    return response["task"]
+
+
+async def _backfill_running() -> bool:
+    tasks = await client.tasks.list(actions="*byquery", detailed=True)
+    return any(
+        f"[{RECIPE_INDEX}]" in task.get("description", "")
+        for node in tasks.get("nodes", {}).values()
+        for task in node.get("tasks", {}).values()
+    )
+
+
 async def setup_indices():
-    exists = await client.indices.exists(index="recipes")
+    global _live_route_by_user
+
+    await put_pipelines()
+
+    exists = await client.indices.exists(index=RECIPE_INDEX)
     if not exists:
         await client.indices.create(
-            index="recipes",
-            body=RECIPE_INDEX_SETTINGS
+            index=RECIPE_INDEX,
+            body=recipe_index_body()
+        )
+        _live_route_by_user = ROUTE_BY_USER
+        return
+
+    mappings = await current_mappings()
+    _live_route_by_user = bool(mappings.get("_routing", {}).get("required"))
+    if ROUTE_BY_USER and not _live_route_by_user:
+        logger.warning(
+            "RECIPE_ROUTING_BY_USER is set but %s is not routed; queries fan out until it is migrated",
+            RECIPE_INDEX,
+        )
+
+    # each step is checked on its own, so a startup that failed halfway
+    # is completed by the next one
+    properties = mappings.get("properties", {})
+    has_suggest = "suggest" in properties.get("recipe_name", {}).get("fields", {})
+    if not has_suggest or "total_minutes" not in properties:
+        await client.indices.put_mapping(index=RECIPE_INDEX, properties=ADDED_FIELDS)
+
+    settings = await client.indices.get_settings(index=RECIPE_INDEX, name="index.default_pipeline")
+    pipelines = {
+        index.get("settings", {}).get("index", {}).get("default_pipeline")
+        for index in settings.values()
+    }
+    if pipelines != {TOTAL_MINUTES_PIPELINE}:
+        await client.indices.put_settings(
+            index=RECIPE_INDEX,
+            settings={"index.default_pipeline": TOTAL_MINUTES_PIPELINE},
         )
+
+    # new fields only apply to documents indexed from now on,
+    # so older recipes are re-indexed in the background
+    missing = await client.count(index=RECIPE_INDEX, query=MISSING_TOTAL_MINUTES_QUERY)
+    if missing["count"] and not await _backfill_running():
+        await backfill_recipes(MISSING_TOTAL_MINUTES_QUERY)
+
+
+async def _run_reindex(**kwargs):
+    """Start a reindex as an ES task and poll it, so it is not bound by the client request timeout."""
+    task = (await client.reindex(wait_for_completion=False, **kwargs))["task"]
+    while True:
+        status = await client.tasks.get(task_id=task)
+        if status.get("completed"):
+            break
+        await asyncio.sleep(MIGRATION_POLL_INTERVAL)
+    if status.get("error"):
+        raise RuntimeError(f"reindex task {task} failed: {status['error']}")
+    failures = status.get("response", {}).get("failures")
+    if failures:
+        raise RuntimeError(f"reindex task {task} failed: {failures[:3]}")
+    return status.get("response", {})
+
+
+async def migrate_recipe_index(target: str, delete_source: bool = False):
+    """
+    Copy all recipes into a new index created with the current layout
+    and make `recipes` an alias of it.
+    Shard count, routing and index sorting cannot change in place, so this
+    is how an existing index moves to a new layout.
+
+    The first pass runs while writers keep writing. Writes to `recipes` are
+    then blocked for a catch-up pass that copies only documents changed in
+    the meantime (external versioning), and the alias is swapped. Deletes
+    made during the first pass are not carried over. Rerunning after a
+    failure reuses an existing target index.
+
+    While `recipes` is still a concrete index (the layout setup_indices
+    creates), the alias can only take its name once it is deleted, so that
+    first migration requires `delete_source=True`. Later migrations keep
+    the old indices.
+    """
+    if await client.indices.exists_alias(name=RECIPE_INDEX):
+        current = list(await client.indices.get_alias(name=RECIPE_INDEX))
+    else:
+        current = []
+    if target in current:
+        raise RuntimeError(f"{target} is already behind the {RECIPE_INDEX} alias")
+    if not current and not delete_source:
+        raise RuntimeError(
+            f"{RECIPE_INDEX} is a concrete index and is deleted when the alias replaces it; "
+            "rerun with --delete-source"
+        )
+
+    # the target's default pipeline fills total_minutes while reindexing
+    await put_pipelines()
+    if not await client.indices.exists(index=target):
+        await client.indices.create(index=target, body=recipe_index_body())
+
+    script = None
+    if ROUTE_BY_USER:
+        script = {"source": "ctx._routing = String.valueOf(ctx._source.user_id)", "lang": "painless"}
+    reindex_args = {
+        "source": {"index": RECIPE_INDEX},
+        "dest": {"index": target, "version_type": "external"},
+        "script": script,
+        "conflicts": "proceed",  # unchanged documents conflict on version
+    }
+
+    await _run_reindex(**reindex_args)
+
+    await client.indices.add_block(index=RECIPE_INDEX, block="write")
+    try:
+        await _run_reindex(refresh=True, **reindex_args)
+
+        if current:
+            actions = [{"remove": {"index": index, "alias": RECIPE_INDEX}} for index in current]
+        else:
+            # `recipes` is still a concrete index; it is replaced by the alias
+            actions = [{"remove_index": {"index": RECIPE_INDEX}}]
+        actions.append({"add": {"index": target, "alias": RECIPE_INDEX}})
+        await client.indices.update_aliases(actions=actions)
+        if not current:
+            logger.warning("deleted index %s, replaced by an alias of %s", RECIPE_INDEX, target)
+    except Exception:
+        await client.indices.put_settings(index=RECIPE_INDEX, settings={"index.blocks.write": False})
+        raise
+
+    if current:
+        # old indices are kept (read-only) behind no alias; delete them once verified
+        logger.warning("old recipe indices %s are write-blocked and can be deleted", current)
+
+
+async def _main(argv):
+    try:
+        if argv[:1] == ["migrate"] and len(argv) in (2, 3):
+            if len(argv) == 3 and argv[2] != "--delete-source":
+                raise SystemExit(f"unknown argument {argv[2]}")
+            await migrate_recipe_index(argv[1], delete_source=len(argv) == 3)
+        elif argv == ["backfill"]:
+            print(await backfill_recipes())
+        else:
+            await setup_indices()
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    # python -m app.elastic.index_setup migrate recipes_v2 [--delete-source]
+    # python -m app.elastic.index_setup backfill
+    asyncio.run(_main(sys.argv[1:]))
@@ -1,6 +1,7 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import search
+from brotli_asgi import BrotliMiddleware
+from app.routers import admin, search
 from app.elastic.index_setup import setup_indices
 import os
 
@@ -11,11 +12,16 @@ from .metrics import (
     requests_in_progress
 )
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from starlette.responses import Response
+from starlette.responses import JSONResponse, Response
 import time
 from app.schemas import RootResponse, HealthResponse
+from app.utils import admission, profiling
+from app import warmup
+import asyncio
 
 ROOT_PATH = os.getenv("ROOT_PATH", "").rstrip("/")
+# responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
 
 app = FastAPI(
     title="Search Service",
@@ -23,6 +29,32 @@ app = FastAPI(
 )
 
 
+# registered before CORSMiddleware so shed responses still carry CORS headers,
+# and before metrics_middleware so shed requests are still counted there
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    path = request.url.path
+    if ROOT_PATH and path.startswith(ROOT_PATH):
+        path = path[len(ROOT_PATH):]
+
+    limiter = admission.get_limiter(path)
+    if limiter is None:
+        return await call_next(request)
+
+    if not await limiter.acquire():
+        return JSONResponse(
+            {"detail": "Service overloaded, retry later"},
+            status_code=503,
+            headers={"Retry-After": str(limiter.retry_after())},
+        )
+
+    start_time = time.time()
+    try:
+        return await call_next(request)
+    finally:
+        limiter.release(time.time() - start_time)
+
+
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5173")
 origins = [o.strip() for o in CORS_ORIGINS.split(",") if o.strip()]
 
@@ -32,14 +64,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# brotli when the client accepts it, gzip otherwise
+app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+
+
+loop_monitor = profiling.LoopMonitor()
+
 
 @app.on_event("startup")
 async def startup_event():
+    loop_monitor.start()
     await setup_indices()
+    app.state.warmup_task = asyncio.create_task(warmup.run_warmup())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    loop_monitor.stop()
+    task = getattr(app.state, "warmup_task", None)
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
 
 app.include_router(search.router)
+app.include_router(admin.router)
+admission.track_routes(search.router.routes)
+
 
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
@@ -4,6 +4,11 @@ num_requests = Counter("http_requests_total", "Total number of HTTP requests", [
 num_errors = Counter("http_request_errors_total", "Total number of HTTP request errors", ["method", "endpoint", "status_code"])
 request_latency = Histogram("http_request_latency_seconds", "HTTP request latency in seconds",  ["method", "endpoint"])
 requests_in_progress = Gauge("http_requests_in_progress", "Number of HTTP requests in progress")
+requests_queued = Gauge("http_requests_queued", "Number of HTTP requests waiting for admission", ["endpoint"])
+requests_shed = Counter("http_requests_shed_total", "Number of HTTP requests rejected by admission control", ["endpoint", "reason"])
 search_queries = Counter("search_queries_total", "Total number of search queries", ["source", "status"])
 search_results_returned = Histogram("search_results_returned", "Number of results returned per search query", ["source", "status"])
-
+search_budget_overruns = Counter("search_budget_overruns_total", "Number of ES searches that hit their time or document budget", ["source", "reason"])
+cache_lookups = Counter("search_cache_lookups_total", "Number of local cache lookups", ["cache", "result"])
+event_loop_lag = Histogram("event_loop_lag_seconds", "Delay of the event loop in waking up a periodic timer", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+event_loop_stalls = Counter("event_loop_stalls_total", "Number of times the event loop was blocked longer than the slow callback threshold")
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from .. import warmup
+from ..schemas import ErrorResponse, HotQueriesResponse, WarmupResponse
+from ..utils.auth import require_admin
+from ..utils import profiling
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+ERROR_401 = {
+    "model": ErrorResponse,
+    "description": "Unauthorized",
+    "content": {"application/json": {"example": {"detail": "Invalid admin token"}}},
+}
+
+
+@router.get(
+    "/hot_queries",
+    response_model=HotQueriesResponse,
+    summary="Popular queries",
+    description="Returns the most frequent explore queries, terms, categories, max_time buckets and suggest prefixes seen by this pod.",
+    responses={401: ERROR_401},
+)
+def hot_queries(
+    n: int = Query(20, ge=1, le=200, description="Max entries per list", examples={"example": {"value": 20}}),
+):
+    return warmup.hot_queries(n)
+
+
+@router.post(
+    "/warmup",
+    response_model=WarmupResponse,
+    summary="Warm up caches",
+    description="Replays this pod's most frequent queries to pre-warm Elasticsearch and local caches.",
+    responses={401: ERROR_401},
+)
+async def warm_up(
+    n: int = Query(20, ge=1, le=200, description="Max queries to replay per list", examples={"example": {"value": 20}}),
+):
+    return {"replayed": await warmup.warm_from_local(n)}
+
+
+@router.post(
+    "/profile",
+    response_class=PlainTextResponse,
+    summary="Sample CPU profile",
+    description="Samples the stacks of the event loop and all threads of this worker and returns them as collapsed stacks (flamegraph.pl / speedscope).",
+    responses={
+        200: {"description": "OK", "content": {"text/plain": {"example": "MainThread;run (asyncio/runners.py:118);... 42"}}},
+        401: ERROR_401,
+        409: {"model": ErrorResponse, "description": "A profile is already running"},
+    },
+)
+async def profile(
+    seconds: float = Query(10, gt=0, le=60, description="How long to sample", examples={"example": {"value": 10}}),
+    interval_ms: float = Query(10, ge=1, le=1000, description="Sampling interval (ms)", examples={"example": {"value": 10}}),
+):
+    collapsed = await profiling.profile(seconds, interval_ms / 1000)
+    if collapsed is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'},
+    )
@@ -2,12 +2,29 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 import httpx
+import os
+from datetime import datetime
+from typing import Annotated
+from pydantic import StringConstraints
 from ..elastic.client import client
+from ..elastic.index_setup import routes_by_user
+from ..elastic.budgets import is_partial, search_budget
 from ..services.social_client import get_following, get_saved
 from ..services.user_client import search_users as user_search
 from ..utils.auth import decode_jwt
-from ..schemas import ErrorResponse, SearchResults, UserSummary
-from ..metrics import search_queries, search_results_returned
+from ..utils.cache import TTLCache
+from ..utils import heavy_hitters
+from ..utils.encoding import get_response_format, render_results
+from ..schemas import (
+    TIME_BUCKETS,
+    ErrorResponse,
+    ExploreFacets,
+    NewPostsCount,
+    SearchResults,
+    SuggestResults,
+    UserSummary,
+)
+from ..metrics import cache_lookups, search_queries, search_results_returned
 
 router = APIRouter(prefix="/search", tags=["Search"])
 bearer = HTTPBearer(auto_error=False)
@@ -29,6 +46,14 @@ EXAMPLE_RESULTS = {
     ]
 }
 
+EXAMPLE_FACETS = {
+    "categories": [{"value": "italian", "count": 12}, {"value": "soup", "count": 7}],
+    "total_time": [{"value": "<=15", "count": 4}, {"value": "<=30", "count": 11}],
+    "partial": False,
+}
+
+EXAMPLE_SUGGESTIONS = {"results": [{"id": "10", "recipe_id": 10, "recipe_name": "Soup"}]}
+
 EXAMPLE_USERS = [{"user_id": 1, "username": "ana"}]
 
 ERROR_401 = {
@@ -43,6 +68,30 @@ ERROR_500 = {
     "content": {"application/json": {"example": {"detail": "Internal server error"}}},
 }
 
+RECIPE_CACHE_TTL = float(os.getenv("RECIPE_CACHE_TTL_SECONDS", "10"))
+RECIPE_CACHE_SIZE = int(os.getenv("RECIPE_CACHE_SIZE", "10000"))
+recipe_cache = TTLCache(maxsize=RECIPE_CACHE_SIZE, ttl=RECIPE_CACHE_TTL)
+
+# feed new-post polling: counts stop at NEW_COUNT_CAP and are cached per viewer
+NEW_COUNT_CAP = int(os.getenv("FEED_NEW_COUNT_CAP", "99"))
+NEW_COUNT_CACHE_TTL = float(os.getenv("FEED_NEW_COUNT_CACHE_TTL_SECONDS", "5"))
+new_count_cache = TTLCache(maxsize=int(os.getenv("FEED_NEW_COUNT_CACHE_SIZE", "10000")), ttl=NEW_COUNT_CACHE_TTL)
+
+# explore facets: anonymous aggregations are cached locally
+FACETS_CACHE_TTL = float(os.getenv("FACETS_CACHE_TTL_SECONDS", "60"))
+FACETS_CATEGORY_SIZE = int(os.getenv("FACETS_CATEGORY_SIZE", "30"))
+facets_cache = TTLCache(maxsize=int(os.getenv("FACETS_CACHE_SIZE", "1024")), ttl=FACETS_CACHE_TTL)
+
+SUGGEST_CACHE_TTL = float(os.getenv("SUGGEST_CACHE_TTL_SECONDS", "30"))
+SUGGEST_CACHE_SIZE = int(os.getenv("SUGGEST_CACHE_SIZE", "2048"))
+suggest_cache = TTLCache(maxsize=SUGGEST_CACHE_SIZE, ttl=SUGGEST_CACHE_TTL)
+
+# feeds following at most this many users are routed to their shards only
+FEED_ROUTING_MAX_USERS = int(os.getenv("FEED_ROUTING_MAX_USERS", "8"))
+
+# upper bound for the approximate total returned with include_total=true
+TOTAL_HITS_CAP = int(os.getenv("TOTAL_HITS_CAP", "1000"))
+
 
 def normalize_following_ids(following):
     if not following:
@@ -100,6 +149,156 @@ def normalize_recipe_source(src: dict) -> dict:
     return out
 
 
+def can_view_recipe(recipe: dict, viewer_id, following) -> bool:
+    """
+    Python equivalent of the visibility rules used in the ES queries:
+    public for everyone, followers_only for followers and the owner,
+    private for the owner only. `following` holds user ids as strings.
+    """
+    visibility = recipe.get("visibility")
+    owner = recipe.get("user_id")
+    is_owner = viewer_id is not None and owner is not None and str(owner) == str(viewer_id)
+    if visibility == "public":
+        return True
+    if visibility == "followers_only":
+        return is_owner or (owner is not None and str(owner) in following)
+    if visibility == "private":
+        return is_owner
+    return False
+
+
+async def fetch_recipes_by_ids(ids):
+    """
+    Return ({id: normalized source}, partial) for the given ES document ids,
+    serving what it can from recipe_cache and fetching the rest with one
+    mget. partial is True when the ES lookup hit its budget.
+    """
+    found = {}
+    partial = False
+    missing = []
+    for doc_id in ids:
+        source = recipe_cache.get(doc_id)
+        if source is None:
+            missing.append(doc_id)
+        else:
+            found[doc_id] = source
+    cache_lookups.labels(cache="recipe", result="hit").inc(len(found))
+    if not missing:
+        return found, partial
+    cache_lookups.labels(cache="recipe", result="miss").inc(len(missing))
+
+    if routes_by_user():
+        # mget needs each document's routing (its owner), which we do not know
+        response = await client.search(
+            index="recipes",
+            query={"ids": {"values": missing}},
+            size=len(missing),
+            track_total_hits=False,
+            **search_budget("recipes")
+        )
+        docs = [dict(hit, found=True) for hit in response["hits"]["hits"]]
+        partial = is_partial(response, "recipes")
+    else:
+        response = await client.mget(index="recipes", ids=missing)
+        docs = response["docs"]
+
+    for doc in docs:
+        if doc.get("found"):
+            source = normalize_recipe_source(doc["_source"])
+            recipe_cache.set(doc["_id"], source)
+            found[doc["_id"]] = source
+    return found, partial
+
+
+def build_feed_query(viewer_id, following):
+    """Public and followers-only recipes of followed users, excluding the viewer's own."""
+    return {
+        "bool": {
+            "must_not": [
+                {"term": {"user_id": viewer_id}}  # exclude viewer's own recipes
+            ],
+            "should": [
+                {
+                    "bool": {
+                        "must": [
+                            {"terms": {"user_id": following}},
+                            {"term": {"visibility": "public"}}
+                        ]
+                    }
+                },
+                {
+                    "bool": {
+                        "must": [
+                            {"terms": {"user_id": following}},
+                            {"term": {"visibility": "followers_only"}}
+                        ]
+                    }
+                }
+            ],
+            "minimum_should_match": 1
+        }
+    }
+
+
+def build_explore_filters(viewer_id, token, following):
+    """Visibility filters of the explore page for the given viewer."""
+    filters = []
+    if token:
+        visibility_block = {
+            "bool": {
+                "should": [
+                    {"term": {"visibility": "public"}},
+                    {
+                        "bool": {
+                            "must": [
+                                {"terms": {"user_id": following}},
+                                {"term": {"visibility": "followers_only"}}
+                            ]
+                        }
+                    },
+                    {"term": {"user_id": viewer_id}}
+                ],
+                "minimum_should_match": 1
+            }
+        }
+        # hide viewer's own recipes in explore
+        filters.append({"bool": {"must_not": [{"term": {"user_id": viewer_id}}]}})
+    else:
+        # unauthenticated users see only public recipes
+        visibility_block = {"term": {"visibility": "public"}}
+
+    filters.append(visibility_block)
+    return filters
+
+
+def user_routing(user_ids):
+    """
+    Routing value for a query restricted to the given users' recipes,
+    or None when the index is not routed by user_id.
+    """
+    if not routes_by_user() or not user_ids:
+        return None
+    return ",".join(str(u) for u in sorted(set(user_ids)))
+
+
+def total_hits_param(include_total: bool):
+    """
+    track_total_hits value for a search. Counting is skipped unless the
+    client asks for a total, which lets ES terminate date-sorted queries
+    early on an index sorted by created_at.
+    """
+    return TOTAL_HITS_CAP if include_total else False
+
+
+def extract_total(response, include_total: bool):
+    if not include_total:
+        return None
+    total = response["hits"].get("total")
+    if isinstance(total, dict):
+        return total.get("value")
+    return total
+
+
 def get_user_and_token_optional(
     credentials: HTTPAuthorizationCredentials | None = Security(bearer),
 ):
@@ -127,8 +326,14 @@ def get_user_and_token_optional(
 )
 async def search_recipes_feed(
     user_token=Depends(get_user_and_token_optional),
+    fmt: str = Depends(get_response_format),
     skip: int = Query(0, ge=0, description="Number of items to skip", examples={"example": {"value": 0}}),
     limit: int = Query(20, ge=1, le=100, description="Max items to return", examples={"example": {"value": 20}}),
+    include_total: bool = Query(
+        False,
+        description=f"Also return an approximate total (counted up to {TOTAL_HITS_CAP})",
+        examples={"example": {"value": False}},
+    ),
 ):
     viewer_id, token = user_token
     if token is None:
@@ -138,41 +343,19 @@ async def search_recipes_feed(
     if not following:
         search_queries.labels(source="feed", status="success").inc()
         search_results_returned.labels(source="feed", status="success").observe(0)
-        return {"results": []}
+        return render_results({"results": []}, fmt)
 
-    es_query = {
-        "bool": {
-            "must_not": [
-                {"term": {"user_id": viewer_id}}  # exclude viewer's own recipes
-            ],
-            "should": [
-                {
-                    "bool": {
-                        "must": [
-                            {"terms": {"user_id": following}},
-                            {"term": {"visibility": "public"}}
-                        ]
-                    }
-                },
-                {
-                    "bool": {
-                        "must": [
-                            {"terms": {"user_id": following}},
-                            {"term": {"visibility": "followers_only"}}
-                        ]
-                    }
-                }
-            ],
-            "minimum_should_match": 1
-        }
-    }
+    es_query = build_feed_query(viewer_id, following)
 
     response = await client.search(
         index="recipes",
         query=es_query,
         sort=[{"created_at": {"order": "desc"}}],
         from_=skip,
-        size=limit
+        size=limit,
+        track_total_hits=total_hits_param(include_total),
+        routing=user_routing(following) if len(following) <= FEED_ROUTING_MAX_USERS else None,
+        **search_budget("feed")
     )
 
     results = [
@@ -186,7 +369,76 @@ async def search_recipes_feed(
 
     search_queries.labels(source="feed", status="success").inc()
     search_results_returned.labels(source="feed", status="success").observe(len(results))
-    return {"results": results}
+    return render_results({
+        "results": results,
+        "total": extract_total(response, include_total),
+        "partial": is_partial(response, "feed"),
+    }, fmt)
+
+
+# cheap polling for new feed posts (za FEED badge)
+@router.get(
+    "/feed/new_count",
+    response_model=NewPostsCount,
+    summary="Count new feed recipes",
+    description=f"Counts feed recipes created after `since`, up to {NEW_COUNT_CAP}.",
+    responses={
+        200: {"description": "OK", "content": {"application/json": {"example": {"count": 3, "capped": False}}}},
+        401: ERROR_401,
+        422: {"description": "Validation error"},
+        500: ERROR_500,
+    },
+)
+async def count_new_feed_recipes(
+    user_token=Depends(get_user_and_token_optional),
+    since: datetime = Query(
+        ...,
+        description="created_at of the newest feed recipe the client has (ISO-8601)",
+        examples={"example": {"value": "2024-05-01T12:00:00Z"}},
+    ),
+):
+    viewer_id, token = user_token
+    if token is None:
+        raise HTTPException(status_code=401, detail="Feed available only when logged in")
+
+    cache_key = (viewer_id, since.isoformat())
+    cached = new_count_cache.get(cache_key)
+    if cached is not None:
+        cache_lookups.labels(cache="feed_new_count", result="hit").inc()
+        return cached
+    cache_lookups.labels(cache="feed_new_count", result="miss").inc()
+
+    following = normalize_following_ids(await get_following(token))
+    if not following:
+        result = {"count": 0, "capped": False}
+        new_count_cache.set(cache_key, result)
+        return result
+
+    es_query = {
+        "bool": {
+            "filter": [
+                build_feed_query(viewer_id, following),
+                {"range": {"created_at": {"gt": since.isoformat()}}}
+            ]
+        }
+    }
+
+    response = await client.search(
+        index="recipes",
+        query=es_query,
+        size=0,
+        track_total_hits=NEW_COUNT_CAP,
+        routing=user_routing(following) if len(following) <= FEED_ROUTING_MAX_USERS else None,
+        **search_budget("feed_new_count")
+    )
+
+    total = response["hits"]["total"]
+    result = {"count": min(total["value"], NEW_COUNT_CAP), "capped": total["relation"] == "gte"}
+    if not is_partial(response, "feed_new_count"):
+        new_count_cache.set(cache_key, result)
+
+    search_queries.labels(source="feed_new_count", status="success").inc()
+    return result
 
 
 # filter for all public recepies and recipes by people you follow + filtering (za EXPLORE page)
@@ -204,6 +456,7 @@ async def search_recipes_feed(
 )
 async def search_recipes_explore(
     user_token=Depends(get_user_and_token_optional),
+    fmt: str = Depends(get_response_format),
     q: str | None = Query(
         None,
         description="Full-text query across name/description/ingredients/keywords/category",
@@ -222,38 +475,22 @@ async def search_recipes_explore(
     ),
     skip: int = Query(0, ge=0, description="Number of items to skip", examples={"example": {"value": 0}}),
     limit: int = Query(20, ge=1, le=100, description="Max items to return", examples={"example": {"value": 20}}),
+    include_total: bool = Query(
+        False,
+        description=f"Also return an approximate total (counted up to {TOTAL_HITS_CAP})",
+        examples={"example": {"value": False}},
+    ),
 ):
     viewer_id, token = user_token
     must = []
-    filters = []
     following = []
+    # recorded exactly as sent to ES, so warm-up replays hit the same request cache entry
+    q = " ".join(q.split()) if q else None
+    heavy_hitters.record_explore(q, category, max_time)
 
     if token:
         following = normalize_following_ids(await get_following(token))
-        visibility_block = {
-            "bool": {
-                "should": [
-                    {"term": {"visibility": "public"}},
-                    {
-                        "bool": {
-                            "must": [
-                                {"terms": {"user_id": following}},
-                                {"term": {"visibility": "followers_only"}}
-                            ]
-                        }
-                    },
-                    {"term": {"user_id": viewer_id}}
-                ],
-                "minimum_should_match": 1
-            }
-        }
-        # hide viewer's own recipes in explore
-        filters.append({"bool": {"must_not": [{"term": {"user_id": viewer_id}}]}})
-    else:
-        # unauthenticated users see only public recipes
-        visibility_block = {"term": {"visibility": "public"}}
-
-    filters.append(visibility_block)
+    filters = build_explore_filters(viewer_id, token, following)
 
     if not q and not category and not max_time:
         es_query = {"bool": {"filter": filters}}
@@ -262,7 +499,10 @@ async def search_recipes_explore(
             query=es_query,
             sort=[{"created_at": {"order": "desc"}}],
             from_=skip,
-            size=limit
+            size=limit,
+            track_total_hits=total_hits_param(include_total),
+            request_cache=token is None,  # anonymous explore pages are shared by everyone
+            **search_budget("explore")
         )
         results = [
             {
@@ -274,7 +514,11 @@ async def search_recipes_explore(
         ]
         search_queries.labels(source="explore", status="success").inc()
         search_results_returned.labels(source="explore", status="success").observe(len(results))
-        return {"results": results}
+        return render_results({
+            "results": results,
+            "total": extract_total(response, include_total),
+            "partial": is_partial(response, "explore"),
+        }, fmt)
 
     if q:
         must.append({
@@ -295,7 +539,7 @@ async def search_recipes_explore(
         filters.append({"term": {"category": category}})
 
     if max_time:
-        filters.append({"range": {"total_time": {"lte": max_time}}})
+        filters.append({"range": {"total_minutes": {"lte": max_time}}})
 
     es_query = {
         "bool": {
@@ -308,7 +552,10 @@ async def search_recipes_explore(
         index="recipes",
         query=es_query,
         from_=skip,
-        size=limit
+        size=limit,
+        track_total_hits=total_hits_param(include_total),
+        request_cache=token is None,
+        **search_budget("explore")
     )
 
     results = [
@@ -322,9 +569,240 @@ async def search_recipes_explore(
 
     search_queries.labels(source="explore", status="success").inc()
     search_results_returned.labels(source="explore", status="success").observe(len(results))
+    return render_results({
+        "results": results,
+        "total": extract_total(response, include_total),
+        "partial": is_partial(response, "explore"),
+    }, fmt)
+
+
+# category / cooking time counts for the explore filters (za EXPLORE page)
+@router.get(
+    "/explore/facets",
+    response_model=ExploreFacets,
+    summary="Explore facet counts",
+    description=(
+        "Returns recipe counts per category and per maximum total time for the explore page. "
+        "Each facet applies the other facet's filter, so counts match what selecting a value would return."
+    ),
+    responses={
+        200: {"description": "OK", "content": {"application/json": {"example": EXAMPLE_FACETS}}},
+        401: ERROR_401,
+        422: {"description": "Validation error"},
+        500: ERROR_500,
+    },
+)
+async def explore_facets(
+    user_token=Depends(get_user_and_token_optional),
+    q: str | None = Query(
+        None,
+        description="Full-text query across name/description/ingredients/keywords/category",
+        examples={"example": {"value": "pasta"}},
+    ),
+    category: str | None = Query(
+        None,
+        description="Selected category (applied to the time facet)",
+        examples={"example": {"value": "italian"}},
+    ),
+    max_time: int | None = Query(
+        None,
+        ge=1,
+        description="Selected maximum total time in minutes (applied to the category facet)",
+        examples={"example": {"value": 45}},
+    ),
+):
+    viewer_id, token = user_token
+    q = " ".join(q.split()) if q else None
+
+    # keyed on the exact q sent to ES: category and keywords match case-sensitively
+    cache_key = (q, category, max_time)
+    if token is None:
+        cached = facets_cache.get(cache_key)
+        if cached is not None:
+            cache_lookups.labels(cache="facets", result="hit").inc()
+            return cached
+        cache_lookups.labels(cache="facets", result="miss").inc()
+
+    following = normalize_following_ids(await get_following(token)) if token else []
+    filters = build_explore_filters(viewer_id, token, following)
+    must = []
+    if q:
+        must.append({
+            "multi_match": {
+                "query": q,
+                "fields": [
+                    "recipe_name^3",
+                    "description",
+                    "ingredients",
+                    "keywords",
+                    "category"
+                ],
+                "fuzziness": "AUTO"
+            }
+        })
+
+    category_filter = {"term": {"category": category}} if category else {"match_all": {}}
+    time_filter = {"range": {"total_minutes": {"lte": max_time}}} if max_time else {"match_all": {}}
+    time_ranges = [{"key": f"<={bound}", "to": bound + 1} for bound in TIME_BUCKETS]
+    time_ranges.append({"key": f">{TIME_BUCKETS[-1]}", "from": TIME_BUCKETS[-1] + 1})
+
+    response = await client.search(
+        index="recipes",
+        query={"bool": {"must": must, "filter": filters}},
+        aggregations={
+            "categories": {
+                "filter": time_filter,
+                "aggs": {"values": {"terms": {"field": "category", "size": FACETS_CATEGORY_SIZE}}}
+            },
+            "total_time": {
+                "filter": category_filter,
+                "aggs": {"values": {"range": {"field": "total_minutes", "ranges": time_ranges}}}
+            }
+        },
+        size=0,
+        track_total_hits=False,
+        request_cache=True,
+        **search_budget("facets")
+    )
+
+    aggs = response["aggregations"]
+    result = {
+        "categories": [
+            {"value": b["key"], "count": b["doc_count"]}
+            for b in aggs["categories"]["values"]["buckets"]
+        ],
+        "total_time": [
+            {"value": b["key"], "count": b["doc_count"]}
+            for b in aggs["total_time"]["values"]["buckets"]
+        ],
+        "partial": is_partial(response, "facets"),
+    }
+    if token is None and not result["partial"]:
+        facets_cache.set(cache_key, result)
+
+    search_queries.labels(source="facets", status="success").inc()
+    return result
+
+
+# prefix autocomplete over public recipe names/keywords (za SEARCH-AS-YOU-TYPE)
+@router.get(
+    "/suggest",
+    response_model=SuggestResults,
+    summary="Suggest recipe names",
+    description="Returns public recipes whose name or keywords match the typed prefix.",
+    responses={
+        200: {"description": "OK", "content": {"application/json": {"example": EXAMPLE_SUGGESTIONS}}},
+        422: {"description": "Validation error"},
+        500: ERROR_500,
+    },
+)
+async def suggest_recipes(
+    q: str = Query(..., min_length=1, max_length=100, description="Typed prefix", examples={"example": {"value": "sou"}}),
+    limit: int = Query(10, ge=1, le=20, description="Max suggestions to return", examples={"example": {"value": 10}}),
+):
+    prefix = " ".join(q.lower().split())
+    if not prefix:
+        return {"results": []}
+    heavy_hitters.record_suggest(prefix)
+
+    cache_key = (prefix, limit)
+    cached = suggest_cache.get(cache_key)
+    if cached is not None:
+        cache_lookups.labels(cache="suggest", result="hit").inc()
+        search_queries.labels(source="suggest", status="success").inc()
+        search_results_returned.labels(source="suggest", status="success").observe(len(cached))
+        return {"results": cached}
+    cache_lookups.labels(cache="suggest", result="miss").inc()
+
+    es_query = {
+        "bool": {
+            "must": [
+                {
+                    "multi_match": {
+                        "query": prefix,
+                        "type": "bool_prefix",
+                        "fields": [
+                            "recipe_name.suggest^3",
+                            "recipe_name.suggest._2gram^3",
+                            "recipe_name.suggest._3gram^3",
+                            "keywords.suggest",
+                            "keywords.suggest._2gram",
+                            "keywords.suggest._3gram"
+                        ]
+                    }
+                }
+            ],
+            "filter": [{"term": {"visibility": "public"}}]
+        }
+    }
+
+    response = await client.search(
+        index="recipes",
+        query=es_query,
+        source=["recipe_id", "recipe_name"],
+        size=limit,
+        track_total_hits=False,
+        request_cache=True,
+        **search_budget("suggest")
+    )
+
+    results = [
+        {
+            "id": hit["_id"],
+            "recipe_id": hit["_source"].get("recipe_id"),
+            "recipe_name": hit["_source"].get("recipe_name"),
+        }
+        for hit in response["hits"]["hits"]
+    ]
+    if not is_partial(response, "suggest"):
+        suggest_cache.set(cache_key, results)
+
+    search_queries.labels(source="suggest", status="success").inc()
+    search_results_returned.labels(source="suggest", status="success").observe(len(results))
     return {"results": results}
 
 
+# batch lookup of known recipe ids (deep links, notifications, saved lists)
+@router.get(
+    "/recipes",
+    response_model=SearchResults,
+    summary="Get recipes by id",
+    description="Returns the requested recipes visible to the viewer, in request order. Unknown or hidden ids are skipped.",
+    responses={
+        200: {"description": "OK", "content": {"application/json": {"example": EXAMPLE_RESULTS}}},
+        401: ERROR_401,
+        422: {"description": "Validation error"},
+        500: ERROR_500,
+    },
+)
+async def get_recipes_by_ids(
+    user_token=Depends(get_user_and_token_optional),
+    fmt: str = Depends(get_response_format),
+    ids: list[Annotated[str, StringConstraints(min_length=1)]] = Query(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="Recipe ids (repeat the parameter: ids=1&ids=2)",
+        examples={"example": {"value": ["10", "12"]}},
+    ),
+):
+    viewer_id, token = user_token
+    following = {str(u) for u in normalize_following_ids(await get_following(token))} if token else set()
+
+    ids = list(dict.fromkeys(ids))
+    recipes, partial = await fetch_recipes_by_ids(ids)
+
+    results = [
+        {"id": doc_id, "score": None, "recipe": recipes[doc_id]}
+        for doc_id in ids
+        if doc_id in recipes and can_view_recipe(recipes[doc_id], viewer_id, following)
+    ]
+
+    search_queries.labels(source="recipes", status="success").inc()
+    search_results_returned.labels(source="recipes", status="success").observe(len(results))
+    return render_results({"results": results, "partial": partial}, fmt)
+
+
 # filter for saved recipes and own recipes + filtering (za SAVED page)
 @router.get(
     "/saved",
@@ -340,6 +818,7 @@ async def search_recipes_explore(
 )
 async def search_recipes_saved(
     user_token=Depends(get_user_and_token_optional),
+    fmt: str = Depends(get_response_format),
     q: str | None = Query(
         None,
         description="Full-text query across name/description/ingredients/keywords/category",
@@ -371,7 +850,7 @@ async def search_recipes_saved(
     if not saved:
         search_queries.labels(source="saved", status="success").inc()
         search_results_returned.labels(source="saved", status="success").observe(0)
-        return {"results": []}
+        return render_results({"results": []}, fmt)
 
     filters.append({
         "bool": {
@@ -424,7 +903,7 @@ async def search_recipes_saved(
         filters.append({"term": {"category": category}})
 
     if max_time:
-        filters.append({"range": {"total_time": {"lte": max_time}}})
+        filters.append({"range": {"total_minutes": {"lte": max_time}}})
 
     es_query = {"bool": {"must": must, "filter": filters}}
 
@@ -432,7 +911,8 @@ async def search_recipes_saved(
         index="recipes",
         query=es_query,
         from_=skip,
-        size=limit
+        size=limit,
+        **search_budget("saved")
     )
 
     results = [
@@ -446,7 +926,10 @@ async def search_recipes_saved(
 
     search_queries.labels(source="saved", status="success").inc()
     search_results_returned.labels(source="saved", status="success").observe(len(results))
-    return {"results": results}
+    return render_results({
+        "results": results,
+        "partial": is_partial(response, "saved"),
+    }, fmt)
 
 
 # filter for own recipes + filtering (za MY RECIPES page)
@@ -464,6 +947,7 @@ async def search_recipes_saved(
 )
 async def search_my_recipes(
     user_token=Depends(get_user_and_token_optional),
+    fmt: str = Depends(get_response_format),
     q: str | None = Query(
         None,
         description="Full-text query across name/description/ingredients/keywords/category",
@@ -482,6 +966,11 @@ async def search_my_recipes(
     ),
     skip: int = Query(0, ge=0, description="Number of items to skip", examples={"example": {"value": 0}}),
     limit: int = Query(20, ge=1, le=100, description="Max items to return", examples={"example": {"value": 20}}),
+    include_total: bool = Query(
+        False,
+        description=f"Also return an approximate total (counted up to {TOTAL_HITS_CAP})",
+        examples={"example": {"value": False}},
+    ),
 ):
     must = []
     filters = []
@@ -513,15 +1002,19 @@ async def search_my_recipes(
         filters.append({"term": {"category": category}})
 
     if max_time:
-        filters.append({"range": {"total_time": {"lte": max_time}}})
+        filters.append({"range": {"total_minutes": {"lte": max_time}}})
 
     es_query = {"bool": {"must": must, "filter": filters}}
 
     response = await client.search(
         index="recipes",
         query=es_query,
+        sort=sort,
         from_=skip,
-        size=limit
+        size=limit,
+        track_total_hits=total_hits_param(include_total),
+        routing=user_routing([viewer_id]),
+        **search_budget("my_recipes")
     )
 
     results = [
@@ -535,7 +1028,11 @@ async def search_my_recipes(
 
     search_queries.labels(source="my_recipes", status="success").inc()
     search_results_returned.labels(source="my_recipes", status="success").observe(len(results))
-    return {"results": results}
+    return render_results({
+        "results": results,
+        "total": extract_total(response, include_total),
+        "partial": is_partial(response, "my_recipes"),
+    }, fmt)
 
 
 @router.get(
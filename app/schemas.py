@@ -27,6 +27,39 @@ class RecipeHit(BaseModel):
 
 class SearchResults(BaseModel):
     results: List[RecipeHit]
+    total: Optional[int] = None
+    partial: bool = False
+
+
+# upper bounds (minutes) of total_time buckets ("<=15" ... ">120"), shared by
+# the explore total_time facet and the hot max_time report
+TIME_BUCKETS = (15, 30, 45, 60, 90, 120)
+
+
+class FacetBucket(BaseModel):
+    value: str
+    count: int
+
+
+class ExploreFacets(BaseModel):
+    categories: List[FacetBucket]
+    total_time: List[FacetBucket]
+    partial: bool = False
+
+
+class NewPostsCount(BaseModel):
+    count: int
+    capped: bool
+
+
+class SuggestHit(BaseModel):
+    id: str
+    recipe_id: Optional[int] = None
+    recipe_name: Optional[str] = None
+
+
+class SuggestResults(BaseModel):
+    results: List[SuggestHit]
 
 
 class UserSummary(BaseModel):
@@ -37,6 +70,32 @@ class UserSummary(BaseModel):
         extra = "allow"
 
 
+class HotItem(BaseModel):
+    value: str
+    count: int
+    error: int
+
+
+class HotExploreQuery(BaseModel):
+    q: Optional[str] = None
+    category: Optional[str] = None
+    max_time: Optional[int] = None
+    count: int
+    error: int
+
+
+class HotQueriesResponse(BaseModel):
+    explore: List[HotExploreQuery]
+    terms: List[HotItem]
+    categories: List[HotItem]
+    max_time: List[HotItem]
+    suggest: List[HotItem]
+
+
+class WarmupResponse(BaseModel):
+    replayed: int
+
+
 class RootResponse(BaseModel):
     msg: str
 
@@ -1,9 +1,16 @@
 import os, httpx
 
+from ..metrics import cache_lookups
+from ..utils.cache import TTLCache
+
 SOCIAL_SERVICE_URL = os.getenv("SOCIAL_SERVICE_URL")
 if not SOCIAL_SERVICE_URL:
     raise RuntimeError("SOCIAL_SERVICE_URL must be set")
 
+# short-lived cache of who each viewer follows (0 disables it)
+FOLLOWING_CACHE_TTL = float(os.getenv("FOLLOWING_CACHE_TTL_SECONDS", "10"))
+_following_cache = TTLCache(maxsize=int(os.getenv("FOLLOWING_CACHE_SIZE", "4096")), ttl=FOLLOWING_CACHE_TTL)
+
 async def get_saved(token: str):
     url = f"{SOCIAL_SERVICE_URL}/saved/me"
     headers = {"Authorization": f"Bearer {token}"}
@@ -13,9 +20,24 @@ async def get_saved(token: str):
         return resp.json()  # list of saved recipes
 
 async def get_following(token: str):
+    if FOLLOWING_CACHE_TTL > 0:
+        cached = _following_cache.get(token)
+        if cached is not None:
+            cache_lookups.labels(cache="following", result="hit").inc()
+            return cached
+        cache_lookups.labels(cache="following", result="miss").inc()
+
     url = f"{SOCIAL_SERVICE_URL}/follows/following/me"
     headers = {"Authorization": f"Bearer {token}"}
     async with httpx.AsyncClient(timeout=10.0) as client:
         resp = await client.get(url, headers=headers)
         resp.raise_for_status()
-        return resp.json()
+        following = resp.json()
+
+    if FOLLOWING_CACHE_TTL > 0:
+        _following_cache.set(token, following)
+    return following
+
+
+def clear_cache():
+    _following_cache.clear()
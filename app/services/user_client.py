@@ -1,14 +1,84 @@
-import os, httpx
+import os, asyncio, httpx
+
+from ..metrics import cache_lookups
+from ..utils.cache import TTLCache
 
 USER_SERVICE_URL = os.getenv("USER_SERVICE_URL")
 if not USER_SERVICE_URL:
     raise RuntimeError("USER_SERVICE_URL must be set")
 
+USER_SEARCH_CACHE_TTL = float(os.getenv("USER_SEARCH_CACHE_TTL_SECONDS", "15"))
+USER_SEARCH_CACHE_SIZE = int(os.getenv("USER_SEARCH_CACHE_SIZE", "4096"))
+# answering a longer prefix by filtering a cached shorter one is only correct
+# if the user service matches usernames case-insensitively by substring
+# ("contains") or prefix ("prefix") and keeps matches in a stable order;
+# "none" (default) always asks the user service
+USER_SEARCH_LOCAL_MATCH = os.getenv("USER_SEARCH_LOCAL_MATCH", "none").lower()
 
-async def search_users(q: str, skip: int = 0, limit: int = 20):
+# (q, skip, limit) -> results page
+_page_cache = TTLCache(maxsize=USER_SEARCH_CACHE_SIZE, ttl=USER_SEARCH_CACHE_TTL)
+# q -> every match for q (first page was not full)
+_complete_cache = TTLCache(maxsize=USER_SEARCH_CACHE_SIZE, ttl=USER_SEARCH_CACHE_TTL)
+_inflight = {}
+
+
+async def _fetch_users(q: str, skip: int, limit: int):
     url = f"{USER_SERVICE_URL}/search"
     params = {"q": q, "skip": skip, "limit": limit}
     async with httpx.AsyncClient(timeout=10.0) as client:
         resp = await client.get(url, params=params)
         resp.raise_for_status()
         return resp.json()
+
+
+def _matches(user, q: str) -> bool:
+    username = user.get("username") if isinstance(user, dict) else None
+    if not isinstance(username, str):
+        return False
+    if USER_SEARCH_LOCAL_MATCH == "prefix":
+        return username.lower().startswith(q.lower())
+    return q.lower() in username.lower()
+
+
+def _from_shorter_prefix(q: str, skip: int, limit: int):
+    if USER_SEARCH_LOCAL_MATCH not in ("contains", "prefix"):
+        return None
+    for end in range(len(q), 0, -1):
+        complete = _complete_cache.get(q[:end])
+        if complete is not None:
+            matched = [u for u in complete if _matches(u, q)]
+            _complete_cache.set(q, matched)
+            return matched[skip:skip + limit]
+    return None
+
+
+async def _fetch_and_cache(q: str, skip: int, limit: int):
+    results = await _fetch_users(q, skip, limit)
+    _page_cache.set((q, skip, limit), results)
+    if skip == 0 and isinstance(results, list) and len(results) < limit:
+        _complete_cache.set(q, results)
+    return results
+
+
+async def search_users(q: str, skip: int = 0, limit: int = 20):
+    key = (q, skip, limit)
+    cached = _page_cache.get(key)
+    if cached is None:
+        cached = _from_shorter_prefix(q, skip, limit)
+    if cached is not None:
+        cache_lookups.labels(cache="user_search", result="hit").inc()
+        return cached
+    cache_lookups.labels(cache="user_search", result="miss").inc()
+
+    # coalesce concurrent identical lookups into one downstream request
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_and_cache(q, skip, limit))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+def clear_cache():
+    _page_cache.clear()
+    _complete_cache.clear()
@@ -0,0 +1,112 @@
+import asyncio
+import math
+import os
+
+from ..metrics import requests_queued, requests_shed
+
+# only routes under this prefix are admission-controlled; cheap routes such
+# as /health and /metrics are never queued behind searches
+ADMISSION_PREFIX = os.getenv("ADMISSION_PREFIX", "/search")
+ADMISSION_CONCURRENCY = int(os.getenv("ADMISSION_CONCURRENCY", "32"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "2"))
+# per-route overrides: "/search/explore=32:64,/search/users=8:16" (concurrency:queue)
+ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS", "")
+
+# weight of the newest request in the moving average of service time
+_EWMA_ALPHA = 0.2
+
+
+def parse_limits(spec: str) -> dict:
+    limits = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        path, _, values = item.partition("=")
+        concurrency, _, queue = values.partition(":")
+        limits[path.strip()] = (
+            int(concurrency),
+            int(queue) if queue else ADMISSION_QUEUE_SIZE,
+        )
+    return limits
+
+
+class RouteLimiter:
+    """
+    Concurrency limit with a bounded wait queue for a single route.
+    Requests are rejected up front when the queue is full or the estimated
+    wait (queue position x average service time) exceeds max_wait.
+    """
+
+    def __init__(self, endpoint: str, concurrency: int, queue_size: int, max_wait: float):
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.waiting = 0
+        self.avg_service_time = 0.0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def estimated_wait(self) -> float:
+        return (self.waiting + 1) * self.avg_service_time / self.concurrency
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait()))
+
+    async def acquire(self) -> bool:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return True
+
+        if self.waiting >= self.queue_size:
+            requests_shed.labels(endpoint=self.endpoint, reason="queue_full").inc()
+            return False
+        if self.estimated_wait() > self.max_wait:
+            requests_shed.labels(endpoint=self.endpoint, reason="deadline").inc()
+            return False
+
+        self.waiting += 1
+        requests_queued.labels(endpoint=self.endpoint).inc()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+            return True
+        except asyncio.TimeoutError:
+            requests_shed.labels(endpoint=self.endpoint, reason="timeout").inc()
+            return False
+        finally:
+            self.waiting -= 1
+            requests_queued.labels(endpoint=self.endpoint).dec()
+
+    def release(self, duration: float):
+        self._semaphore.release()
+        if self.avg_service_time == 0.0:
+            self.avg_service_time = duration
+        else:
+            self.avg_service_time += _EWMA_ALPHA * (duration - self.avg_service_time)
+
+
+_route_limits = parse_limits(ADMISSION_LIMITS)
+_route_paths = set()
+_limiters = {}
+
+
+def track_routes(routes):
+    """
+    Give each of the given routes its own limiter; other paths share one.
+    Pass the router's own routes (their paths include the router prefix).
+    """
+    _route_paths.update(route.path for route in routes if hasattr(route, "path"))
+
+
+def get_limiter(path: str) -> RouteLimiter | None:
+    if not ADMISSION_PREFIX or not path.startswith(ADMISSION_PREFIX):
+        return None
+    if path not in _route_paths:
+        path = ADMISSION_PREFIX
+    limiter = _limiters.get(path)
+    if limiter is None:
+        concurrency, queue_size = _route_limits.get(path, (ADMISSION_CONCURRENCY, ADMISSION_QUEUE_SIZE))
+        limiter = RouteLimiter(path, concurrency, queue_size, ADMISSION_MAX_WAIT)
+        _limiters[path] = limiter
+    return limiter
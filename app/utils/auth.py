@@ -1,12 +1,15 @@
-import os, jwt
+import os, hmac, jwt
 from fastapi import HTTPException, Security
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi.security import APIKeyHeader, HTTPAuthorizationCredentials, HTTPBearer
 from jwt import ExpiredSignatureError, InvalidTokenError
 
 
 security = HTTPBearer()
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
+# shared secret for /admin endpoints; admin endpoints are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+admin_token_header = APIKeyHeader(name="X-Admin-Token", auto_error=False)
 
 if not JWT_SECRET or not JWT_ALGORITHM:
     raise RuntimeError("JWT_SECRET and JWT_ALGORITHM must be set in the environment for search_service")
@@ -26,3 +29,9 @@ def get_current_user_id(credentials: HTTPAuthorizationCredentials = Security(sec
         return payload["user_id"], credentials.credentials
     except InvalidTokenError as e:
         raise HTTPException(status_code=401, detail=str(e))
+
+def require_admin(token: str | None = Security(admin_token_header)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
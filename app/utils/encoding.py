@@ -0,0 +1,96 @@
+import msgpack
+from fastapi import Header, Query
+from fastapi.responses import JSONResponse, Response
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+COLUMNAR_MEDIA_TYPE = "application/vnd.personalcook.columnar+json"
+
+
+def parse_accept(accept: str | None) -> str:
+    """
+    Pick the encoding for an Accept header: the listed media type with the
+    highest q-value wins (earlier entries on ties); q=0 means "not
+    acceptable". Anything else, including wildcards, gets plain JSON.
+    """
+    best = ("json", 0.0)
+    for entry in (accept or "").split(","):
+        media_type, *params = [part.strip() for part in entry.split(";")]
+        media_type = media_type.lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            fmt = "msgpack"
+        elif media_type == COLUMNAR_MEDIA_TYPE:
+            fmt = "columnar"
+        elif media_type == "application/json":
+            fmt = "json"
+        else:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best[1]:
+            best = (fmt, q)
+    return best[0]
+
+
+def get_response_format(
+    response: Response,
+    format: str | None = Query(
+        None,
+        pattern="^(json|columnar|msgpack)$",
+        description=(
+            "Response encoding: json (default schema), columnar (one column list and row arrays) "
+            "or msgpack (columnar layout as MessagePack). Can also be negotiated via Accept."
+        ),
+        examples={"example": {"value": "columnar"}},
+    ),
+    accept: str | None = Header(None, include_in_schema=False),
+) -> str:
+    # every encoding of these endpoints depends on Accept, including plain JSON
+    response.headers["Vary"] = "Accept"
+    if format:
+        return format
+    return parse_accept(accept)
+
+
+def to_columnar(payload: dict) -> dict:
+    """
+    Flatten {"results": [{"id", "score", "recipe": {...}}]} into
+    {"columns": [...], "rows": [[...]]} so key names are sent once.
+    Recipe fields become columns in order of first appearance.
+    """
+    hits = payload.get("results", [])
+    recipe_columns = {}
+    for hit in hits:
+        for key in hit["recipe"]:
+            recipe_columns.setdefault(key, None)
+
+    columns = ["id", "score"] + list(recipe_columns)
+    rows = [
+        [hit["id"], hit.get("score")] + [hit["recipe"].get(key) for key in recipe_columns]
+        for hit in hits
+    ]
+    out = {key: value for key, value in payload.items() if key != "results"}
+    out["columns"] = columns
+    out["rows"] = rows
+    return out
+
+
+def render_results(payload: dict, fmt: str):
+    """
+    Return search results in the negotiated encoding. The default JSON
+    payload is returned as-is so it is still validated by response_model.
+    """
+    if fmt == "columnar":
+        return JSONResponse(to_columnar(payload), media_type=COLUMNAR_MEDIA_TYPE, headers={"Vary": "Accept"})
+    if fmt == "msgpack":
+        return Response(
+            msgpack.packb(to_columnar(payload), use_bin_type=True),
+            media_type=MSGPACK_MEDIA_TYPES[0],
+            headers={"Vary": "Accept"},
+        )
+    return payload
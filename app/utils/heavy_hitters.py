@@ -0,0 +1,85 @@
+import contextvars
+import os
+
+from ..schemas import TIME_BUCKETS
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch.
+    Keeps at most `capacity` counters; an unseen item replaces the smallest
+    counter and inherits its count as over-estimation error, so every item
+    seen more than total/capacity times is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self._counts = {}
+        self._errors = {}
+
+    def add(self, item, weight: int = 1):
+        if item in self._counts:
+            self._counts[item] += weight
+            return
+        if len(self._counts) < self.capacity:
+            self._counts[item] = weight
+            self._errors[item] = 0
+            return
+        victim = min(self._counts, key=self._counts.get)
+        floor = self._counts.pop(victim)
+        del self._errors[victim]
+        self._counts[item] = floor + weight
+        self._errors[item] = floor
+
+    def top(self, n: int):
+        """Return up to n (item, count, error) tuples, most frequent first."""
+        items = sorted(self._counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return [(item, count, self._errors[item]) for item, count in items]
+
+    def clear(self):
+        self._counts.clear()
+        self._errors.clear()
+
+    def __len__(self):
+        return len(self._counts)
+
+
+HEAVY_HITTERS_CAPACITY = int(os.getenv("HEAVY_HITTERS_CAPACITY", "256"))
+
+explore_queries = SpaceSaving(HEAVY_HITTERS_CAPACITY)
+query_terms = SpaceSaving(HEAVY_HITTERS_CAPACITY)
+categories = SpaceSaving(HEAVY_HITTERS_CAPACITY)
+max_time_buckets = SpaceSaving(len(TIME_BUCKETS) + 1)
+suggest_prefixes = SpaceSaving(HEAVY_HITTERS_CAPACITY)
+
+# switched off while warm-up replays queries so replays are not counted
+recording = contextvars.ContextVar("heavy_hitters_recording", default=True)
+
+
+def max_time_bucket(max_time: int) -> str:
+    for bound in TIME_BUCKETS:
+        if max_time <= bound:
+            return f"<={bound}"
+    return f">{TIME_BUCKETS[-1]}"
+
+
+def record_explore(q: str | None, category: str | None, max_time: int | None):
+    if not recording.get():
+        return
+    explore_queries.add((q, category, max_time))
+    if q:
+        query_terms.add(q)
+    if category:
+        categories.add(category)
+    if max_time:
+        max_time_buckets.add(max_time_bucket(max_time))
+
+
+def record_suggest(prefix: str):
+    if recording.get():
+        suggest_prefixes.add(prefix)
+
+
+def clear():
+    for sketch in (explore_queries, query_terms, categories, max_time_buckets, suggest_prefixes):
+        sketch.clear()
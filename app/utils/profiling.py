@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+from ..metrics import event_loop_lag, event_loop_stalls
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL_SECONDS", "0.5"))
+SLOW_CALLBACK_THRESHOLD = float(os.getenv("SLOW_CALLBACK_THRESHOLD_SECONDS", "0.1"))
+
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    filename = "/".join(path[-2:])
+    return f"{code.co_name} ({filename}:{frame.f_lineno})".replace(";", ":")
+
+
+def _collapse(frame) -> list:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter:
+    """
+    Sample the Python stack of every thread (including the event loop)
+    every `interval` seconds for `seconds` seconds.
+    Returns counts keyed by collapsed stack ("thread;outer;...;inner").
+    """
+    me = threading.get_ident()
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread = names.get(ident, str(ident)).replace(";", ":").replace(" ", "_")
+            stacks[";".join([thread] + _collapse(frame))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """Brendan Gregg's collapsed format, readable by flamegraph.pl and speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+async def profile(seconds: float, interval: float) -> str | None:
+    """
+    Run the sampler in a worker thread so the event loop keeps serving
+    (and is itself sampled). Returns None if a profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        loop = asyncio.get_running_loop()
+        stacks = await loop.run_in_executor(None, sample_stacks, seconds, interval)
+    finally:
+        _profile_lock.release()
+    return format_collapsed(stacks)
+
+
+class LoopMonitor:
+    """
+    Measures event loop lag by timing a periodic sleep, and runs a watchdog
+    thread that logs the loop thread's stack while a callback blocks the
+    loop for longer than `threshold`.
+    """
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, threshold: float = SLOW_CALLBACK_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self._last_tick = time.monotonic()
+        self._loop_thread = None
+        self._task = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._last_tick = time.monotonic()
+        # a fresh event per start, so a watchdog left over from a previous
+        # start still sees its own stop signal
+        self._stopped = threading.Event()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        threading.Thread(target=self._watchdog, args=(self._stopped,), name="loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _measure(self):
+        while True:
+            start = time.monotonic()
+            self._last_tick = start
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - start - self.interval)
+            event_loop_lag.observe(lag)
+            if lag > self.threshold:
+                # logged (with the blocking stack) by the watchdog
+                event_loop_stalls.inc()
+
+    def _watchdog(self, stopped):
+        reported_tick = None
+        while not stopped.wait(self.threshold):
+            tick = self._last_tick
+            stalled = time.monotonic() - tick - self.interval
+            if stalled <= self.threshold or tick == reported_tick:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            reported_tick = tick
+            logger.warning(
+                "event loop blocked for over %.3fs, currently in:\n%s",
+                stalled,
+                "".join(traceback.format_stack(frame)),
+            )
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+
+import httpx
+
+from app.routers import search
+from app.utils import heavy_hitters
+from app.utils.auth import ADMIN_TOKEN
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "20"))
+# replay the local top queries every N seconds (0 disables the schedule)
+WARMUP_INTERVAL = float(os.getenv("WARMUP_INTERVAL_SECONDS", "0"))
+# admin hot-queries endpoint of a running pod, used to warm up new pods
+# e.g. http://search-service:8000/admin/hot_queries
+WARMUP_SOURCE_URL = os.getenv("WARMUP_SOURCE_URL")
+# upper bound for the startup warm-up; the pod serves traffic meanwhile
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+
+
+def hot_queries(n: int) -> dict:
+    def items(sketch):
+        return [
+            {"value": value, "count": count, "error": error}
+            for value, count, error in sketch.top(n)
+        ]
+
+    return {
+        "explore": [
+            {"q": q, "category": category, "max_time": max_time, "count": count, "error": error}
+            for (q, category, max_time), count, error in heavy_hitters.explore_queries.top(n)
+        ],
+        "terms": items(heavy_hitters.query_terms),
+        "categories": items(heavy_hitters.categories),
+        "max_time": items(heavy_hitters.max_time_buckets),
+        "suggest": items(heavy_hitters.suggest_prefixes),
+    }
+
+
+async def replay(hot: dict) -> int:
+    """
+    Run the given hot explore queries (anonymously) and suggest prefixes
+    to fill the ES filter/page caches and the local suggest cache.
+    """
+    replayed = 0
+    token = heavy_hitters.recording.set(False)
+    try:
+        for entry in hot.get("explore", []):
+            try:
+                await search.search_recipes_explore(
+                    user_token=(None, None),
+                    fmt="json",
+                    q=entry.get("q"),
+                    category=entry.get("category"),
+                    max_time=entry.get("max_time"),
+                    skip=0,
+                    limit=20,
+                    include_total=False,
+                )
+                replayed += 1
+            except Exception as e:
+                logger.warning("warm-up of explore query %r failed: %s", entry, e)
+        for entry in hot.get("suggest", []):
+            try:
+                await search.suggest_recipes(q=entry["value"], limit=10)
+                replayed += 1
+            except Exception as e:
+                logger.warning("warm-up of suggest prefix %r failed: %s", entry, e)
+    finally:
+        heavy_hitters.recording.reset(token)
+    return replayed
+
+
+async def warm_from_local(n: int = WARMUP_TOP_N) -> int:
+    return await replay(hot_queries(n))
+
+
+async def warm_from_source(n: int = WARMUP_TOP_N) -> int:
+    if not WARMUP_SOURCE_URL:
+        return 0
+    headers = {"X-Admin-Token": ADMIN_TOKEN} if ADMIN_TOKEN else {}
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        resp = await client.get(WARMUP_SOURCE_URL, params={"n": n}, headers=headers)
+        resp.raise_for_status()
+        hot = resp.json()
+    replayed = await replay(hot)
+    logger.info("warmed up %d queries from %s", replayed, WARMUP_SOURCE_URL)
+    return replayed
+
+
+async def run_warmup():
+    """
+    Background task started with the app: a time-bounded warm-up from
+    WARMUP_SOURCE_URL, then (if configured) periodic local warm-ups.
+    """
+    try:
+        await asyncio.wait_for(warm_from_source(), timeout=WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("startup warm-up stopped after %.0fs", WARMUP_TIMEOUT)
+    except Exception as e:
+        logger.warning("startup warm-up failed: %s", e)
+
+    if WARMUP_INTERVAL <= 0:
+        return
+    while True:
+        await asyncio.sleep(WARMUP_INTERVAL)
+        try:
+            await warm_from_local()
+        except Exception as e:
+            logger.warning("scheduled warm-up failed: %s", e)
@@ -16,8 +16,12 @@ os.environ.setdefault("USER_SERVICE_URL", "http://user-service.local")
 os.environ.setdefault("RECIPE_SERVICE_URL", "http://recipe-service.local/recipes")
 os.environ.setdefault("ELASTICSEARCH_HOST", "http://localhost:9200")
 os.environ.setdefault("ELASTICSEARCH_PASSWORD", "test-secret")
+os.environ.setdefault("ADMIN_TOKEN", "test-admin-token")
 
 from app.main import app  # noqa: E402
+from app.routers import search as search_router  # noqa: E402
+from app.services import social_client, user_client  # noqa: E402
+from app.utils import heavy_hitters  # noqa: E402
 
 app.router.on_startup.clear()
 
@@ -25,6 +29,13 @@ app.router.on_startup.clear()
 @pytest.fixture()
 def client():
     app.dependency_overrides = {}
+    search_router.suggest_cache.clear()
+    search_router.recipe_cache.clear()
+    search_router.new_count_cache.clear()
+    search_router.facets_cache.clear()
+    user_client.clear_cache()
+    social_client.clear_cache()
+    heavy_hitters.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides = {}
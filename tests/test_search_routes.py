@@ -1,8 +1,15 @@
+import asyncio
 import os
 
 import jwt
+import msgpack
+import pytest
+from prometheus_client import REGISTRY
 
 from app.routers import search as search_router
+from app.schemas import TIME_BUCKETS
+from app.services import user_client
+from app.utils import admission
 
 
 def _auth_headers(user_id=1):
@@ -53,7 +60,7 @@ def test_explore_returns_results(client, monkeypatch):
 
     response = client.get("/search/explore")
     assert response.status_code == 200
-    assert response.json() == {"results": []}
+    assert response.json() == {"results": [], "total": None, "partial": False}
 
 
 def test_saved_requires_auth(client):
@@ -100,3 +107,676 @@ def test_users_search_proxies_to_user_service(client, monkeypatch):
     response = client.get("/search/users", params={"q": "an"})
     assert response.status_code == 200
     assert response.json()[0]["username"] == "ana"
+
+
+def test_suggest_returns_public_prefix_matches(client, monkeypatch):
+    calls = []
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return {
+            "hits": {
+                "hits": [
+                    {
+                        "_id": "10",
+                        "_score": 1.0,
+                        "_source": {"recipe_name": "Soup", "recipe_id": 10},
+                    }
+                ]
+            }
+        }
+
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    response = client.get("/search/suggest", params={"q": "So"})
+    assert response.status_code == 200
+    assert response.json() == {"results": [{"id": "10", "recipe_id": 10, "recipe_name": "Soup"}]}
+    assert calls[0]["query"]["bool"]["filter"] == [{"term": {"visibility": "public"}}]
+    assert calls[0]["source"] == ["recipe_id", "recipe_name"]
+
+    # same prefix (case-insensitive) is answered from the local cache
+    response = client.get("/search/suggest", params={"q": "so"})
+    assert response.status_code == 200
+    assert len(calls) == 1
+
+
+def test_users_search_answers_longer_prefix_from_complete_result(client, monkeypatch):
+    calls = []
+
+    async def fake_fetch_users(q, skip, limit):
+        calls.append((q, skip, limit))
+        return [{"user_id": 1, "username": "ana"}, {"user_id": 2, "username": "andrej"}]
+
+    monkeypatch.setattr(user_client, "USER_SEARCH_LOCAL_MATCH", "contains")
+    monkeypatch.setattr(user_client, "_fetch_users", fake_fetch_users)
+
+    response = client.get("/search/users", params={"q": "an"})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+    response = client.get("/search/users", params={"q": "and"})
+    assert response.status_code == 200
+    assert [u["username"] for u in response.json()] == ["andrej"]
+    assert calls == [("an", 0, 20)]
+
+
+def test_users_search_forwards_every_new_query_by_default(client, monkeypatch):
+    calls = []
+
+    async def fake_fetch_users(q, skip, limit):
+        calls.append((q, skip, limit))
+        return [{"user_id": 1, "username": "ana"}]
+
+    monkeypatch.setattr(user_client, "_fetch_users", fake_fetch_users)
+    assert user_client.USER_SEARCH_LOCAL_MATCH == "none"
+
+    client.get("/search/users", params={"q": "an"})
+    client.get("/search/users", params={"q": "ana"})
+    client.get("/search/users", params={"q": "an"})  # same query, cached page
+    assert calls == [("an", 0, 20), ("ana", 0, 20)]
+
+
+def test_my_recipes_routes_by_viewer_when_enabled(client, monkeypatch):
+    calls = []
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return {"hits": {"hits": []}}
+
+    monkeypatch.setattr(search_router, "routes_by_user", lambda: True)
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    response = client.get("/search/my_recipes", headers=_auth_headers(user_id=7))
+    assert response.status_code == 200
+    assert calls[0]["routing"] == "7"
+
+
+def test_explore_date_sorted_skips_total_unless_requested(client, monkeypatch):
+    calls = []
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return {"hits": {"total": {"value": 42, "relation": "eq"}, "hits": []}}
+
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    response = client.get("/search/explore")
+    assert calls[0]["track_total_hits"] is False
+    assert response.json()["total"] is None
+
+    response = client.get("/search/explore", params={"include_total": True})
+    assert calls[1]["track_total_hits"] == search_router.TOTAL_HITS_CAP
+    assert response.json()["total"] == 42
+
+
+def test_search_sheds_with_retry_after_when_queue_is_full(client, monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(admission, "_limiters", {})
+    monkeypatch.setattr(admission, "_route_limits", {"/search/explore": (1, 0)})
+    monkeypatch.setattr(main, "ROOT_PATH", "/api/search")
+
+    limiter = admission.get_limiter("/search/explore")
+    assert limiter.concurrency == 1 and limiter.queue_size == 0
+    assert asyncio.run(limiter.acquire())  # the only slot is busy
+
+    response = client.get("/api/search/search/explore")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    # other registered routes have their own limiter
+    assert admission.get_limiter("/search/feed") is not limiter
+    # unknown paths share the prefix-wide limiter
+    assert admission.get_limiter("/search/nope") is admission.get_limiter("/search/other")
+    # cheap routes bypass admission control
+    assert admission.get_limiter("/health") is None
+    assert client.get("/health").status_code == 200
+
+
+def test_shed_response_carries_cors_headers(client, monkeypatch):
+    monkeypatch.setattr(admission, "_limiters", {})
+    monkeypatch.setattr(admission, "_route_limits", {"/search/explore": (1, 0)})
+
+    limiter = admission.get_limiter("/search/explore")
+    assert asyncio.run(limiter.acquire())
+
+    response = client.get("/search/explore", headers={"Origin": "http://localhost:5173"})
+    assert response.status_code == 503
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert "retry-after" in response.headers["access-control-expose-headers"].lower()
+
+
+def _shed_count(endpoint, reason):
+    value = REGISTRY.get_sample_value(
+        "http_requests_shed_total", {"endpoint": endpoint, "reason": reason}
+    )
+    return value or 0
+
+
+def test_limiter_rejects_when_estimated_wait_exceeds_deadline():
+    limiter = admission.RouteLimiter("/test/deadline", concurrency=1, queue_size=10, max_wait=0.5)
+    limiter.avg_service_time = 2.0
+    before = _shed_count("/test/deadline", "deadline")
+
+    async def run():
+        assert await limiter.acquire()
+        return await limiter.acquire()
+
+    assert asyncio.run(run()) is False
+    assert limiter.retry_after() == 2
+    assert _shed_count("/test/deadline", "deadline") == before + 1
+
+
+def test_limiter_sheds_queued_request_after_max_wait():
+    limiter = admission.RouteLimiter("/test/timeout", concurrency=1, queue_size=10, max_wait=0.01)
+    before = _shed_count("/test/timeout", "timeout")
+
+    async def run():
+        assert await limiter.acquire()
+        return await limiter.acquire()
+
+    assert asyncio.run(run()) is False
+    assert limiter.waiting == 0
+    assert _shed_count("/test/timeout", "timeout") == before + 1
+
+
+def test_admin_hot_queries_requires_token(client):
+    response = client.get("/admin/hot_queries")
+    assert response.status_code == 401
+
+
+def test_admin_hot_queries_reports_explore_queries(client, monkeypatch):
+    async def fake_search(**kwargs):
+        return {"hits": {"hits": []}}
+
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    for _ in range(3):
+        client.get("/search/explore", params={"q": "Pasta", "category": "italian"})
+    client.get("/search/explore", params={"max_time": 40})
+
+    response = client.get(
+        "/admin/hot_queries",
+        headers={"X-Admin-Token": os.environ["ADMIN_TOKEN"]},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["explore"][0] == {"q": "Pasta", "category": "italian", "max_time": None, "count": 3, "error": 0}
+    assert data["categories"][0]["value"] == "italian"
+    assert data["max_time"] == [{"value": "<=45", "count": 1, "error": 0}]
+
+
+def test_warmup_replays_the_query_body_explore_sent(client, monkeypatch):
+    from app import warmup
+
+    calls = []
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return {"hits": {"hits": []}}
+
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    client.get("/search/explore", params={"q": "  Pasta   Carbonara "})
+    asyncio.run(warmup.warm_from_local())
+    assert len(calls) == 2
+    assert calls[1]["query"] == calls[0]["query"]
+    assert calls[0]["query"]["bool"]["must"][0]["multi_match"]["query"] == "Pasta Carbonara"
+
+
+def test_admin_profile_returns_collapsed_stacks(client):
+    response = client.post(
+        "/admin/profile",
+        params={"seconds": 0.05, "interval_ms": 5},
+        headers={"X-Admin-Token": os.environ["ADMIN_TOKEN"]},
+    )
+    assert response.status_code == 200
+    lines = response.text.strip().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) > 0
+
+
+def _fake_search_hits(count):
+    async def fake_search(**kwargs):
+        return {
+            "hits": {
+                "hits": [
+                    {
+                        "_id": str(i),
+                        "_score": 1.0,
+                        "_source": {"recipe_name": f"Soup {i}", "recipe_id": i, "total_time": "00:30:00"},
+                    }
+                    for i in range(count)
+                ]
+            }
+        }
+
+    return fake_search
+
+
+def test_explore_columnar_and_msgpack_encodings(client, monkeypatch):
+    monkeypatch.setattr(search_router.client, "search", _fake_search_hits(2))
+
+    response = client.get("/search/explore", params={"format": "columnar"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["columns"] == ["id", "score", "recipe_name", "recipe_id", "total_time"]
+    assert data["rows"][1] == ["1", 1.0, "Soup 1", 1, 30]
+
+    response = client.get("/search/explore", headers={"Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content)["rows"] == data["rows"]
+
+
+def test_large_responses_are_compressed(client, monkeypatch):
+    monkeypatch.setattr(search_router.client, "search", _fake_search_hits(50))
+
+    response = client.get("/search/explore", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["results"]) == 50
+
+
+def test_explore_sends_budget_and_flags_partial_results(client, monkeypatch):
+    calls = []
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return {"timed_out": True, "hits": {"hits": []}}
+
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    response = client.get("/search/explore", params={"q": "pasta"})
+    assert response.status_code == 200
+    assert response.json()["partial"] is True
+    assert calls[0]["timeout"] == "1s"
+    assert calls[0]["request_cache"] is True
+
+
+def test_recipes_by_ids_applies_visibility_in_request_order(client, monkeypatch):
+    calls = []
+
+    async def fake_get_following(token):
+        return [2]
+
+    async def fake_mget(**kwargs):
+        calls.append(kwargs)
+        return {
+            "docs": [
+                {"_id": "1", "found": True, "_source": {"user_id": 2, "visibility": "followers_only"}},
+                {"_id": "2", "found": True, "_source": {"user_id": 3, "visibility": "private"}},
+                {"_id": "3", "found": True, "_source": {"user_id": 3, "visibility": "public"}},
+                {"_id": "4", "found": False},
+            ]
+        }
+
+    monkeypatch.setattr(search_router, "get_following", fake_get_following)
+    monkeypatch.setattr(search_router.client, "mget", fake_mget)
+
+    response = client.get("/search/recipes", params={"ids": ["3", "4", "2", "1"]}, headers=_auth_headers())
+    assert response.status_code == 200
+    assert [hit["id"] for hit in response.json()["results"]] == ["3", "1"]
+
+    # anonymous viewers only see public recipes; documents come from the cache
+    response = client.get("/search/recipes", params={"ids": ["1", "3"]})
+    assert [hit["id"] for hit in response.json()["results"]] == ["3"]
+    assert len(calls) == 1
+
+
+def test_feed_new_count_runs_size_zero_capped_count(client, monkeypatch):
+    calls = []
+
+    async def fake_get_following(token):
+        return [2]
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return {"hits": {"total": {"value": 3, "relation": "eq"}, "hits": []}}
+
+    monkeypatch.setattr(search_router, "get_following", fake_get_following)
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    params = {"since": "2024-05-01T12:00:00Z"}
+    response = client.get("/search/feed/new_count", params=params, headers=_auth_headers())
+    assert response.status_code == 200
+    assert response.json() == {"count": 3, "capped": False}
+    assert calls[0]["size"] == 0
+    assert calls[0]["track_total_hits"] == search_router.NEW_COUNT_CAP
+    assert calls[0]["query"]["bool"]["filter"][1] == {"range": {"created_at": {"gt": "2024-05-01T12:00:00+00:00"}}}
+
+    # repeated polls within the TTL are served from the per-viewer cache
+    client.get("/search/feed/new_count", params=params, headers=_auth_headers())
+    assert len(calls) == 1
+
+
+def test_explore_facets_aggregates_and_caches_anonymous_counts(client, monkeypatch):
+    calls = []
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return {
+            "hits": {"hits": []},
+            "aggregations": {
+                "categories": {"values": {"buckets": [{"key": "soup", "doc_count": 7}]}},
+                "total_time": {"values": {"buckets": [{"key": "<=15", "doc_count": 4}]}},
+            },
+        }
+
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    response = client.get("/search/explore/facets", params={"category": "soup"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "categories": [{"value": "soup", "count": 7}],
+        "total_time": [{"value": "<=15", "count": 4}],
+        "partial": False,
+    }
+    assert calls[0]["size"] == 0
+    assert calls[0]["query"]["bool"]["filter"] == [{"term": {"visibility": "public"}}]
+    assert calls[0]["aggregations"]["total_time"]["filter"] == {"term": {"category": "soup"}}
+    assert calls[0]["aggregations"]["total_time"]["aggs"]["values"]["range"]["field"] == "total_minutes"
+    assert "runtime_mappings" not in calls[0]
+
+    client.get("/search/explore/facets", params={"category": "soup"})
+    assert len(calls) == 1
+
+
+def test_explore_facets_cache_is_keyed_on_the_exact_query(client, monkeypatch):
+    calls = []
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return {
+            "hits": {"hits": []},
+            "aggregations": {
+                "categories": {"values": {"buckets": []}},
+                "total_time": {"values": {"buckets": []}},
+            },
+        }
+
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    client.get("/search/explore/facets", params={"q": "Soup"})
+    client.get("/search/explore/facets", params={"q": "soup"})
+    client.get("/search/explore/facets", params={"q": " soup "})
+    assert [c["query"]["bool"]["must"][0]["multi_match"]["query"] for c in calls] == ["Soup", "soup"]
+    ranges = calls[0]["aggregations"]["total_time"]["aggs"]["values"]["range"]["ranges"]
+    assert [r["key"] for r in ranges] == [f"<={b}" for b in TIME_BUCKETS] + [f">{TIME_BUCKETS[-1]}"]
+
+
+def test_explore_max_time_filters_on_numeric_total_minutes(client, monkeypatch):
+    calls = []
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return {"hits": {"hits": []}}
+
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    client.get("/search/explore", params={"max_time": 30})
+    assert {"range": {"total_minutes": {"lte": 30}}} in calls[0]["query"]["bool"]["filter"]
+
+
+async def _fake_put_pipeline(**kwargs):
+    return None
+
+
+def _fake_existing_index(monkeypatch, mappings, default_pipeline=None, missing=0, running=()):
+    """Mock the ES calls setup_indices makes against an existing recipes index."""
+    from app.elastic import index_setup
+
+    calls = []
+
+    def record(name, result=None):
+        async def fake(**kwargs):
+            calls.append((name, kwargs))
+            return result
+        return fake
+
+    async def fake_exists(index):
+        return True
+
+    async def fake_get_mapping(index):
+        return {"recipes": {"mappings": mappings}}
+
+    index_settings = {"default_pipeline": default_pipeline} if default_pipeline else {}
+    tasks = {f"node:{i}": {"description": d} for i, d in enumerate(running)}
+    monkeypatch.setattr(index_setup.client.ingest, "put_pipeline", _fake_put_pipeline)
+    monkeypatch.setattr(index_setup.client.indices, "exists", fake_exists)
+    monkeypatch.setattr(index_setup.client.indices, "get_mapping", fake_get_mapping)
+    monkeypatch.setattr(index_setup.client.indices, "put_mapping", record("put_mapping"))
+    monkeypatch.setattr(index_setup.client.indices, "put_settings", record("put_settings"))
+    monkeypatch.setattr(
+        index_setup.client.indices, "get_settings",
+        record("get_settings", {"recipes": {"settings": {"index": index_settings}}}),
+    )
+    monkeypatch.setattr(index_setup.client, "count", record("count", {"count": missing}))
+    monkeypatch.setattr(index_setup.client.tasks, "list", record("list", {"nodes": {"n1": {"tasks": tasks}}}))
+    monkeypatch.setattr(index_setup.client, "update_by_query", record("update_by_query", {"task": "node:1"}))
+    return calls
+
+
+def _writes(calls):
+    return [(name, kwargs) for name, kwargs in calls if name in ("put_mapping", "put_settings", "update_by_query")]
+
+
+COMPLETE_PROPERTIES = {
+    "recipe_name": {"type": "text", "fields": {"suggest": {"type": "search_as_you_type"}}},
+    "total_minutes": {"type": "integer"},
+}
+
+
+def test_setup_indices_backfills_when_fields_are_added(monkeypatch):
+    from app.elastic import index_setup
+
+    calls = _fake_existing_index(
+        monkeypatch, {"properties": {"recipe_name": {"type": "text"}}}, missing=10,
+    )
+
+    asyncio.run(index_setup.setup_indices())
+    writes = _writes(calls)
+    assert [name for name, _ in writes] == ["put_mapping", "put_settings", "update_by_query"]
+    assert writes[0][1]["properties"]["total_minutes"] == {"type": "integer"}
+    assert writes[1][1]["settings"] == {"index.default_pipeline": index_setup.TOTAL_MINUTES_PIPELINE}
+    assert writes[2][1]["query"] == index_setup.MISSING_TOTAL_MINUTES_QUERY
+    assert writes[2][1]["conflicts"] == "proceed"
+    assert writes[2][1]["wait_for_completion"] is False
+
+
+def test_setup_indices_finishes_a_startup_that_failed_after_put_mapping(monkeypatch):
+    from app.elastic import index_setup
+
+    # the mapping was updated, but the pipeline setting and backfill never ran
+    calls = _fake_existing_index(monkeypatch, {"properties": COMPLETE_PROPERTIES}, missing=10)
+
+    asyncio.run(index_setup.setup_indices())
+    assert [name for name, _ in _writes(calls)] == ["put_settings", "update_by_query"]
+
+
+def test_setup_indices_is_a_no_op_once_complete_or_while_backfilling(monkeypatch):
+    from app.elastic import index_setup
+
+    pipeline = index_setup.TOTAL_MINUTES_PIPELINE
+    calls = _fake_existing_index(monkeypatch, {"properties": COMPLETE_PROPERTIES}, pipeline)
+    asyncio.run(index_setup.setup_indices())
+    assert _writes(calls) == []
+
+    calls = _fake_existing_index(
+        monkeypatch, {"properties": COMPLETE_PROPERTIES}, pipeline,
+        missing=10, running=["update-by-query [recipes]"],
+    )
+    asyncio.run(index_setup.setup_indices())
+    assert _writes(calls) == []
+
+
+def test_setup_indices_reads_routing_from_live_mapping(monkeypatch):
+    from app.elastic import index_setup
+
+    _fake_existing_index(
+        monkeypatch,
+        {"_routing": {"required": True}, "properties": COMPLETE_PROPERTIES},
+        index_setup.TOTAL_MINUTES_PIPELINE,
+    )
+    monkeypatch.setattr(index_setup, "ROUTE_BY_USER", False)
+    monkeypatch.setattr(index_setup, "_live_route_by_user", False)
+
+    asyncio.run(index_setup.setup_indices())
+    assert index_setup.routes_by_user() is True
+
+
+def test_my_recipes_does_not_route_while_live_index_is_unrouted(client, monkeypatch):
+    from app.elastic import index_setup
+
+    calls = []
+
+    async def fake_search(**kwargs):
+        calls.append(kwargs)
+        return {"hits": {"hits": []}}
+
+    monkeypatch.setattr(index_setup, "ROUTE_BY_USER", True)
+    monkeypatch.setattr(index_setup, "_live_route_by_user", False)
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    client.get("/search/my_recipes", headers=_auth_headers(user_id=7))
+    assert calls[0]["routing"] is None
+
+
+def test_migration_polls_reindex_tasks_and_swaps_alias(monkeypatch):
+    from app.elastic import index_setup
+
+    calls = []
+    polls = iter([{"completed": False}, {"completed": True, "response": {"failures": []}},
+                  {"completed": True, "response": {"failures": []}}])
+
+    def record(name, result=None):
+        async def fake(**kwargs):
+            calls.append((name, kwargs))
+            return result
+        return fake
+
+    async def fake_get_task(task_id):
+        return next(polls)
+
+    async def fake_exists(index):
+        return False
+
+    async def fake_exists_alias(name):
+        return False
+
+    monkeypatch.setattr(index_setup, "MIGRATION_POLL_INTERVAL", 0)
+    monkeypatch.setattr(index_setup.client.ingest, "put_pipeline", _fake_put_pipeline)
+    monkeypatch.setattr(index_setup.client.tasks, "get", fake_get_task)
+    monkeypatch.setattr(index_setup.client.indices, "exists", fake_exists)
+    monkeypatch.setattr(index_setup.client.indices, "exists_alias", fake_exists_alias)
+    for namespace, name, result in (
+        (index_setup.client.indices, "create", None),
+        (index_setup.client, "reindex", {"task": "node:1"}),
+        (index_setup.client.indices, "add_block", None),
+        (index_setup.client.indices, "update_aliases", None),
+    ):
+        monkeypatch.setattr(namespace, name, record(name, result))
+
+    asyncio.run(index_setup.migrate_recipe_index("recipes_v2", delete_source=True))
+    assert [name for name, _ in calls] == ["create", "reindex", "add_block", "reindex", "update_aliases"]
+    assert calls[0][1]["body"]["settings"]["index"]["default_pipeline"] == index_setup.TOTAL_MINUTES_PIPELINE
+    assert all(kw["wait_for_completion"] is False for name, kw in calls if name == "reindex")
+    assert calls[-1][1]["actions"] == [
+        {"remove_index": {"index": "recipes"}},
+        {"add": {"index": "recipes_v2", "alias": "recipes"}},
+    ]
+
+
+def test_migration_refuses_to_delete_concrete_index_without_opt_in(monkeypatch):
+    from app.elastic import index_setup
+
+    async def fake_exists_alias(name):
+        return False
+
+    async def fail(**kwargs):
+        raise AssertionError("no index may be created or copied")
+
+    monkeypatch.setattr(index_setup.client.indices, "exists_alias", fake_exists_alias)
+    monkeypatch.setattr(index_setup.client.indices, "create", fail)
+    monkeypatch.setattr(index_setup.client, "reindex", fail)
+
+    with pytest.raises(RuntimeError, match="--delete-source"):
+        asyncio.run(index_setup.migrate_recipe_index("recipes_v2"))
+
+
+def test_startup_warmup_is_time_bounded(monkeypatch):
+    from app import warmup
+
+    async def slow_warm_from_source():
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(warmup, "warm_from_source", slow_warm_from_source)
+    monkeypatch.setattr(warmup, "WARMUP_TIMEOUT", 0.01)
+    monkeypatch.setattr(warmup, "WARMUP_INTERVAL", 0)
+
+    async def run():
+        await asyncio.wait_for(warmup.run_warmup(), timeout=1)
+
+    asyncio.run(run())
+
+
+def test_loop_monitor_restarts_watchdog_and_logs_stall_once(caplog):
+    import time
+
+    from app.utils.profiling import LoopMonitor
+
+    monitor = LoopMonitor(interval=0.02, threshold=0.05)
+
+    async def run():
+        monitor.start()
+        monitor.stop()
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)  # block the loop
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    with caplog.at_level("WARNING", logger="app.utils.profiling"):
+        asyncio.run(run())
+
+    stalls = [r for r in caplog.records if "event loop blocked" in r.getMessage()]
+    assert len(stalls) == 1
+    assert "time.sleep(0.3)" in stalls[0].getMessage()
+
+
+def test_accept_negotiation_honours_q_values_and_always_varies(client, monkeypatch):
+    from app.utils.encoding import parse_accept
+
+    assert parse_accept("application/msgpack;q=0, application/json") == "json"
+    assert parse_accept("application/json;q=0.5, application/msgpack") == "msgpack"
+    assert parse_accept("application/vnd.personalcook.columnar+json") == "columnar"
+    assert parse_accept("*/*") == "json"
+    assert parse_accept(None) == "json"
+
+    monkeypatch.setattr(search_router.client, "search", _fake_search_hits(1))
+
+    response = client.get("/search/explore", headers={"Accept": "application/msgpack;q=0"})
+    assert response.headers["content-type"] == "application/json"
+    assert "Accept" in response.headers["vary"]
+
+
+def test_recipes_by_ids_rejects_empty_ids(client):
+    response = client.get("/search/recipes", params={"ids": ["1", ""]})
+    assert response.status_code == 422
+
+
+def test_recipes_by_ids_flags_partial_routed_lookup(client, monkeypatch):
+    async def fake_search(**kwargs):
+        return {
+            "timed_out": True,
+            "hits": {"hits": [{"_id": "3", "_source": {"user_id": 3, "visibility": "public"}}]},
+        }
+
+    monkeypatch.setattr(search_router, "routes_by_user", lambda: True)
+    monkeypatch.setattr(search_router.client, "search", fake_search)
+
+    response = client.get("/search/recipes", params={"ids": ["3", "4"]})
+    assert response.status_code == 200
+    data = response.json()
+    assert [hit["id"] for hit in data["results"]] == ["3"]
+    assert data["partial"] is True